@@ -7,13 +7,18 @@ maximum battery life — no polling loop, wakes on timer or button press.
 Required CircuitPython libraries in /lib/:
   - adafruit_requests.mpy
   - adafruit_connection_manager.mpy
-  - adafruit_display_text/  (folder)
+  - adafruit_display_text/  (folder; uses bitmap_label)
 
 Copy this file to CIRCUITPY/code.py and settings.toml to CIRCUITPY/settings.toml.
 """
 
 import time
 import os
+import binascii
+import gc
+import io
+import ipaddress
+import msgpack
 import board
 import displayio
 import terminalio
@@ -22,30 +27,97 @@ import socketpool
 import digitalio
 import analogio
 import alarm
-import adafruit_requests
-from adafruit_display_text.label import Label
+from micropython import const
+# adafruit_requests and adafruit_display_text are imported where they are
+# first used: a button wake that redraws from the cache never touches the
+# network, and an unchanged timer wake never builds a label, so neither
+# should pay for loading those libraries.
 
 # ── Config ──────────────────────────────────────────────────
 API_BASE = os.getenv("MEAL_PLANNER_URL")
 REFRESH_MINUTES = int(os.getenv("REFRESH_MINUTES", "30"))
-
-WIDTH = 296
-HEIGHT = 128
+# Fast black/white waveform for meal screens (original IL0373 MagTag only)
+FAST_REFRESH = os.getenv("FAST_REFRESH", "0") == "1"
+FULL_REFRESH_EVERY = int(os.getenv("FULL_REFRESH_EVERY", "10"))
+# Night mode: between SLEEP_HOUR and WAKE_HOUR (server local time) sleep
+# straight through to WAKE_HOUR instead of waking every REFRESH_MINUTES.
+# Equal hours (the default) disable it.
+SLEEP_HOUR = int(os.getenv("SLEEP_HOUR", "0"))
+WAKE_HOUR = int(os.getenv("WAKE_HOUR", "0"))
+DEBUG = os.getenv("DEBUG", "0") == "1"
+# How long a DHCP lease is reused as a static address before a wake does
+# a real DHCP exchange; must stay below the router's lease time
+LEASE_REUSE_S = int(os.getenv("LEASE_REUSE_MINUTES", "45")) * 60
+# Bytes per recv_into when streaming a response body. A one-day
+# MessagePack payload is a few hundred bytes, so it usually arrives in a
+# single read instead of one per 64-byte slice.
+RECV_CHUNK = 512
+
+# Integer layout and sleep-memory constants use const() so the
+# compiler inlines them instead of doing a globals lookup per use.
+# (const() is int-only, so LOW_BATTERY_V stays a plain float.)
+WIDTH = const(296)
+HEIGHT = const(128)
 FONT = terminalio.FONT
-CHAR_W = 6
-HEADER_H = 28
+CHAR_W = const(6)
+HEADER_H = const(28)
 LOW_BATTERY_V = 3.5
 
+# Layout geometry — fixed, so worked out once rather than per render
+HEADER_Y = const(HEADER_H // 2)  # vertical centre of header text
+MAX_CHARS = const((WIDTH - 16) // CHAR_W)  # ~46 chars per line at 1x
+MAX_BIG = const((WIDTH - 16) // (CHAR_W * 2))  # ~23 chars per line at 2x
+COL1_X = const(8)  # baby breakfast; lunch and dinner follow at COL_PITCH
+COL_PITCH = const(96)  # evenly spaced columns: x = 8, 104, 200
+ITEM_X = const(8)  # item text offset from its bullet
+ITEM_CHARS = const(14)  # baby item truncation, fits one column
+ROW_H = const(11)
+DINNER_Y = const(HEADER_H + 12)  # first line of the 2x adult dinner
+# Baby column headings as one label: terminalio is fixed-width, so padding
+# each heading out to a column's worth of characters lines it up
+_COL_CHARS = const(COL_PITCH // CHAR_W)
+COL_HEADINGS = ("BREAKFAST" + " " * (_COL_CHARS - 9)
+                + "LUNCH" + " " * (_COL_CHARS - 5) + "DINNER")
+
 # Button pins: A=D15, B=D14, C=D12, D=D11
 PIN_BTN_A = board.D15
+PIN_BTN_B = board.D14
 PIN_BTN_C = board.D12
+PIN_BTN_D = board.D11
+BUTTON_PINS = (PIN_BTN_A, PIN_BTN_B, PIN_BTN_C, PIN_BTN_D)
+
+# ── Sleep memory layout ─────────────────────────────────────
+# alarm.sleep_memory survives deep sleep (but not power loss), so
+# anything that must outlive a wake cycle is stored here. Timestamps use
+# the RTC (time.time()): it keeps counting through deep sleep, whereas a
+# real deep-sleep wake resets the chip and restarts time.monotonic().
+SM_RENDER_KEY = const(0)  # 4 bytes: CRC-32 of the meal content currently on the panel
+SM_FAST_COUNT = const(4)  # 4 bytes: fast refreshes since the last full refresh
+SM_AP = const(8)  # 7 bytes: channel (0 = none) + BSSID of the last AP joined
+SM_NET = const(16)  # 20 bytes: IPv4, netmask, gateway, DNS, API server (0.0.0.0 = unset)
+SM_WAKE_AT = const(36)  # 4 bytes: time of the next scheduled timer wake
+SM_NET_AT = const(40)  # 4 bytes: time the saved lease came from DHCP
+SM_CACHE = const(64)  # 4-byte length + MessagePack of today's formatted meals
 
 # ── Disable NeoPixel/sensor power rail ──────────────────────
 # The MagTag's NEOPIXEL_POWER pin gates power to the NeoPixels
-# and LIS3DH accelerometer. Default is HIGH (on), wasting ~3-5mA.
+# and LIS3DH accelerometer, wasting ~3-5mA while on. It is active-low
+# (also exposed as NEOPIXEL_POWER_INVERTED; adafruit_magtag drives it
+# False to enable the rail), so True switches the rail off.
 _neopixel_power = digitalio.DigitalInOut(board.NEOPIXEL_POWER)
 _neopixel_power.direction = digitalio.Direction.OUTPUT
-_neopixel_power.value = False
+_neopixel_power.value = True
+
+
+# ── Disable BLE ─────────────────────────────────────────────
+# The ESP32-S3 MagTag has a BLE radio, and CircuitPython's BLE workflow
+# can leave the adapter on (the S2 has no BLE, so _bleio is absent there).
+# Nothing here uses Bluetooth, so turn it off for the wake.
+try:
+    import _bleio
+    _bleio.adapter.enabled = False
+except (ImportError, AttributeError):
+    pass
 
 
 # ── Graphics primitives ─────────────────────────────────────
@@ -58,151 +130,487 @@ def word_wrap(text, n):
     """Split text into two lines, breaking at word boundary if possible."""
     if len(text) <= n:
         return text, ""
+    # Slice around the space itself rather than strip()ing both halves,
+    # so only the two returned strings are allocated
     break_at = text.rfind(" ", 0, n + 1)
     if break_at <= 0:
-        break_at = n
-    return text[:break_at].rstrip(), text[break_at:].lstrip()
+        return text[:n], text[n:]
+    return text[:break_at], text[break_at + 1:]
+
+
+# Every shape is a solid fill, so each bitmap and palette is allocated
+# once and shared by all the TileGrids drawn from it.
+_PAL_WHITE = displayio.Palette(1)
+_PAL_WHITE[0] = 0xFFFFFF
+_PAL_BLACK = displayio.Palette(1)
+_PAL_BLACK[0] = 0x000000
+_BMP_BG = displayio.Bitmap(WIDTH, HEIGHT, 1)
+_BMP_HEADER = displayio.Bitmap(WIDTH, HEADER_H, 1)
+_BMP_HLINE = displayio.Bitmap(WIDTH - 16, 1, 1)
+# Bullets for the baby columns: one TileGrid cell per column x row, tile
+# 0 blank (transparent) and tile 1 a 3x3 dot, so a single grid carries
+# every bullet instead of one TileGrid each
+_BMP_BULLETS = displayio.Bitmap(COL_PITCH * 2, ROW_H, 2)
+for _y in range(3):
+    for _x in range(3):
+        _BMP_BULLETS[COL_PITCH + _x, _y] = 1
+_PAL_BULLETS = displayio.Palette(2)
+_PAL_BULLETS[1] = 0x000000
+_PAL_BULLETS.make_transparent(0)
 
 
 def white_bg():
-    bmp = displayio.Bitmap(WIDTH, HEIGHT, 1)
-    pal = displayio.Palette(1)
-    pal[0] = 0xFFFFFF
-    return displayio.TileGrid(bmp, pixel_shader=pal)
+    return displayio.TileGrid(_BMP_BG, pixel_shader=_PAL_WHITE)
 
 
-def black_bar(w, h, x=0, y=0):
-    bmp = displayio.Bitmap(w, h, 1)
-    pal = displayio.Palette(1)
-    pal[0] = 0x000000
-    return displayio.TileGrid(bmp, pixel_shader=pal, x=x, y=y)
+def header_bar():
+    """Full-width black bar behind the header text."""
+    return displayio.TileGrid(_BMP_HEADER, pixel_shader=_PAL_BLACK)
 
 
-def hline(y, x=8, w=None):
-    if w is None:
-        w = WIDTH - 16
-    bmp = displayio.Bitmap(w, 1, 1)
-    pal = displayio.Palette(1)
-    pal[0] = 0x000000
-    return displayio.TileGrid(bmp, pixel_shader=pal, x=x, y=y)
+def hline(y):
+    return displayio.TileGrid(_BMP_HLINE, pixel_shader=_PAL_BLACK, x=8, y=y)
 
 
-def bullet(x, y, size=3):
-    """Small filled square used as a list bullet."""
-    bmp = displayio.Bitmap(size, size, 1)
-    pal = displayio.Palette(1)
-    pal[0] = 0x000000
-    return displayio.TileGrid(bmp, pixel_shader=pal, x=x, y=y - size // 2)
+def bullets(columns, y):
+    """One TileGrid holding every column bullet, first row at baseline y."""
+    rows = max(1, max(len(items) for items in columns))  # TileGrid needs >= 1 row
+    grid = displayio.TileGrid(_BMP_BULLETS, pixel_shader=_PAL_BULLETS,
+                              width=len(columns), height=rows,
+                              tile_width=COL_PITCH, tile_height=ROW_H,
+                              default_tile=0, x=COL1_X, y=y - 1)
+    for col, items in enumerate(columns):
+        for row in range(len(items)):
+            grid[col, row] = 1
+    return grid
 
 
 def big_text(text, x, y, color=0x000000):
-    """Label rendered at 2x scale via a scaled Group."""
-    grp = displayio.Group(scale=2, x=x, y=y)
-    grp.append(Label(FONT, text=text, color=color, x=0, y=0))
-    return grp
+    """Label rendered at 2x scale."""
+    from adafruit_display_text.bitmap_label import Label
+    return Label(FONT, text=text, color=color, scale=2, x=x, y=y)
 
 
 # ── Hardware ────────────────────────────────────────────────
+def collect(where):
+    """Run the GC at a point of our choosing rather than mid-refresh."""
+    gc.collect()
+    if DEBUG:
+        print(f"Free after {where}: {gc.mem_free()}")
+
+
+def sm_read_u32(offset):
+    return int.from_bytes(alarm.sleep_memory[offset:offset + 4], "little")
+
+
+def sm_write_u32(offset, value):
+    alarm.sleep_memory[offset:offset + 4] = (value & 0xFFFFFFFF).to_bytes(4, "little")
+
+
+# The ADC stays claimed for the whole wake instead of being set up and
+# torn down per reading; close_battery() releases it before deep sleep.
+BATT_SCALE = 3.3 * 2 / 65535  # 16-bit reading -> volts (3.3V ref, 1:2 divider)
+BATT_SAMPLES = const(8)  # ADC reads averaged per battery measurement
+try:
+    _batt_adc = analogio.AnalogIn(board.VOLTAGE_MONITOR)
+except (ValueError, RuntimeError) as e:
+    print(f"Battery monitor unavailable: {e}")
+    _batt_adc = None
+
+
+def format_batt(batt):
+    """Battery volts to one decimal ("3.9v") with plain integer %-formatting."""
+    tenths = int(batt * 10 + 0.5)
+    return "%d.%dv" % (tenths // 10, tenths % 10)
+
+
 def read_battery():
-    adc = analogio.AnalogIn(board.VOLTAGE_MONITOR)
-    v = (adc.value / 65535) * 3.3 * 2
-    adc.deinit()
-    return v
+    if _batt_adc is None:
+        return 0.0
+    # Average a few samples in integer math; a single read is noisy
+    total = 0
+    for _ in range(BATT_SAMPLES):
+        total += _batt_adc.value
+    return (total // BATT_SAMPLES) * BATT_SCALE
+
+
+def close_battery():
+    global _batt_adc
+    if _batt_adc is not None:
+        _batt_adc.deinit()
+        _batt_adc = None
 
 
 # ── Network ─────────────────────────────────────────────────
+_HEX = b"0123456789ABCDEF"
+
+
 def format_mac(mac_bytes):
-    """Format MAC address bytes as colon-separated hex string."""
-    return ":".join(f"{b:02X}" for b in mac_bytes)
+    """Format MAC address bytes as colon-separated hex via a nibble table."""
+    out = bytearray(b":" * (len(mac_bytes) * 3 - 1))
+    for i, b in enumerate(mac_bytes):
+        out[i * 3] = _HEX[b >> 4]
+        out[i * 3 + 1] = _HEX[b & 0xF]
+    return out.decode()
 
 
 def get_mac():
     return format_mac(wifi.radio.mac_address)
 
 
+def save_ap(channel, bssid):
+    alarm.sleep_memory[SM_AP] = channel
+    alarm.sleep_memory[SM_AP + 1:SM_AP + 7] = bssid
+
+
+def load_ap():
+    """Return (channel, bssid) of the last AP joined, or (0, None)."""
+    channel = alarm.sleep_memory[SM_AP]
+    if not 1 <= channel <= 14:
+        return 0, None
+    return channel, bytes(alarm.sleep_memory[SM_AP + 1:SM_AP + 7])
+
+
+def find_ap(ssid):
+    """Scan once for ssid and return (channel, bssid) of its strongest AP,
+    or (0, None) if it isn't on the air."""
+    best = None
+    for net in wifi.radio.start_scanning_networks():
+        if net.ssid == ssid and (best is None or net.rssi > best.rssi):
+            best = net
+    wifi.radio.stop_scanning_networks()
+    if best is None:
+        return 0, None
+    return best.channel, bytes(best.bssid)
+
+
+_NO_ADDR = b"\x00\x00\x00\x00"
+
+
+_lease_reused = False  # set by connect() when it applied the saved lease
+
+
+def save_net(server_ip=None):
+    """Remember this wake's DHCP lease and the API server's resolved address."""
+    if not _lease_reused:  # re-saving a reused lease mustn't extend its life
+        sm_write_u32(SM_NET_AT, time.time())
+    r = wifi.radio
+    buf = (r.ipv4_address.packed + r.ipv4_subnet.packed + r.ipv4_gateway.packed
+           + (r.ipv4_dns.packed if r.ipv4_dns else _NO_ADDR)
+           + (ipaddress.ip_address(server_ip).packed if server_ip else _NO_ADDR))
+    alarm.sleep_memory[SM_NET:SM_NET + 20] = buf
+
+
+def forget_net():
+    alarm.sleep_memory[SM_NET:SM_NET + 20] = bytes(20)
+
+
+def load_net():
+    """Return the saved [ipv4, netmask, gateway, dns, server], or None if
+    there is none or it is past LEASE_REUSE_S."""
+    raw = bytes(alarm.sleep_memory[SM_NET:SM_NET + 20])
+    if raw[:4] == _NO_ADDR:
+        return None
+    if not 0 <= time.time() - sm_read_u32(SM_NET_AT) < LEASE_REUSE_S:
+        return None
+    return [None if raw[i:i + 4] == _NO_ADDR else ipaddress.IPv4Address(raw[i:i + 4])
+            for i in range(0, 20, 4)]
+
+
 def connect():
+    global _lease_reused
     if wifi.radio.connected:
         return
     wifi.radio.enabled = True
-    print("Connecting to WiFi...")
-    wifi.radio.connect(
-        os.getenv("CIRCUITPY_WIFI_SSID"),
-        os.getenv("CIRCUITPY_WIFI_PASSWORD"),
-    )
+    # Modem power save parks the radio between beacons, which delays every
+    # round trip; the radio is only on for a few seconds per wake anyway
+    try:
+        wifi.radio.power_management = wifi.PowerManagement.NONE
+    except AttributeError:  # CircuitPython < 9.1
+        pass
+    ssid = os.getenv("CIRCUITPY_WIFI_SSID")
+    password = os.getenv("CIRCUITPY_WIFI_PASSWORD")
+
+    # Reuse the last wake's lease as a static address so the join doesn't
+    # wait on DHCP; a failed fetch forgets it and the next wake uses DHCP
+    lease = load_net()
+    if lease:
+        wifi.radio.set_ipv4_address(ipv4=lease[0], netmask=lease[1],
+                                    gateway=lease[2], ipv4_dns=lease[3])
+    _lease_reused = bool(lease)
+
+    # Joining with a known channel + BSSID skips the radio's own scan;
+    # the AP from the last wake is usually still the right one
+    channel, bssid = load_ap()
+    if channel:
+        print(f"Connecting to WiFi (channel {channel})...")
+        try:
+            wifi.radio.connect(ssid, password, channel=channel, bssid=bssid)
+        except ConnectionError as e:
+            print(f"Saved AP failed: {e}")
+            save_ap(0, b"\x00" * 6)
+            channel = 0
+
+    if not channel:
+        # Scan first so a missing network fails fast instead of waiting
+        # out a blind connect attempt with the radio on
+        print("Scanning for WiFi...")
+        channel, bssid = find_ap(ssid)
+        if channel:
+            wifi.radio.connect(ssid, password, channel=channel, bssid=bssid)
+        else:
+            # Hidden networks scan with an empty SSID; a plain connect
+            # probes for the name and can still find them
+            print("Not in scan, trying a direct connect...")
+            try:
+                wifi.radio.connect(ssid, password)
+            except ConnectionError:
+                raise ConnectionError(f"WiFi network '{ssid}' not found")
+            ap = wifi.radio.ap_info
+            channel, bssid = ap.channel, bytes(ap.bssid)
+        save_ap(channel, bssid)
     print(f"Connected: {wifi.radio.ipv4_address}")
 
 
-def fetch_today(session):
-    url = f"{API_BASE}/api/schedule/upcoming"
+def read_body(resp):
+    """Stream the response body into a BytesIO, RECV_CHUNK at a time."""
+    stream = io.BytesIO()
+    for chunk in resp.iter_content(chunk_size=RECV_CHUNK):
+        stream.write(chunk)
+    stream.seek(0)
+    return stream
+
+
+def api_target(pool):
+    """Return (base_url, host_header, server_ip), reusing the saved server IP to skip DNS."""
+    scheme, rest = API_BASE.split("://", 1)
+    hostport, _, path = rest.partition("/")
+    host, _, port = hostport.partition(":")
+    if scheme != "http" or all(c in "0123456789." for c in host):
+        return API_BASE, None, None
+    lease = load_net()
+    if lease and lease[4]:
+        server_ip = str(lease[4])
+    else:
+        server_ip = pool.getaddrinfo(host, int(port or 80))[0][4][0]
+    base = "http://" + server_ip
+    if port:
+        base += ":" + port
+    if path:
+        base += "/" + path
+    return base, hostport, server_ip
+
+
+def fetch_today(session, base=API_BASE, host=None):
+    """Fetch today's meals as (day, updated_at), turning the radio off once the body is in."""
+    # Only today is shown, so don't make the server send (or us parse) more
+    url = f"{base}/api/schedule/upcoming?days=1"
     print(f"Fetching {url}")
-    resp = session.get(url)
-    data = resp.json()
-    resp.close()
+    # MessagePack is decoded by CircuitPython's native msgpack module —
+    # faster and smaller than resp.json()'s Python-level parse
+    headers = {"Accept": "application/msgpack"}
+    if host:
+        headers["Host"] = host
+    resp = session.get(url, headers=headers)
+    if "msgpack" in resp.headers.get("content-type", ""):
+        body = read_body(resp)
+        resp.close()
+        wifi.radio.enabled = False
+        data = msgpack.unpack(body)
+    else:
+        data = resp.json()  # older server without MessagePack support
+        resp.close()
+        wifi.radio.enabled = False
+    print("WiFi disabled")
+    collect("fetch")  # parsing leaves the most garbage
     return data["days"][0], data.get("updated_at", "")
 
 
+# ── Meal cache ──────────────────────────────────────────────
+def save_today(meals):
+    """Cache today's formatted meals in sleep memory for button-wake redraws."""
+    stream = io.BytesIO()
+    msgpack.pack({"ts": time.time(), "meals": meals}, stream)
+    buf = stream.getvalue()
+    end = SM_CACHE + 4 + len(buf)
+    if end > len(alarm.sleep_memory):
+        print(f"Meal cache too large ({len(buf)} bytes), not saved")
+        sm_write_u32(SM_CACHE, 0)
+        return
+    alarm.sleep_memory[SM_CACHE + 4:end] = buf
+    sm_write_u32(SM_CACHE, len(buf))
+
+
+def load_today():
+    """Return the cached format_today() result, or None if there is none
+    or it is older than one refresh interval."""
+    n = sm_read_u32(SM_CACHE)
+    if not 0 < n <= len(alarm.sleep_memory) - SM_CACHE - 4:
+        return None
+    try:
+        raw = bytes(alarm.sleep_memory[SM_CACHE + 4:SM_CACHE + 4 + n])
+        data = msgpack.unpack(io.BytesIO(raw))
+        age = time.time() - data["ts"]
+        if not 0 <= age < REFRESH_MINUTES * 60:
+            return None
+        return data["meals"]
+    except Exception as e:  # msgpack raises various errors on garbage
+        print(f"Meal cache unreadable: {e}")
+        return None
+
+
 # ── Display ─────────────────────────────────────────────────
-def _refresh():
+# Start sequence selecting the IL0373's built-in black/white (OTP)
+# waveform instead of the board's 4-level grayscale LUT, which is what
+# makes a default refresh slow. From adafruit_il0373, sized for 128x296.
+FAST_START_SEQUENCE = (
+    b"\x01\x05\x03\x00\x2b\x2b\x09"  # power setting
+    b"\x06\x03\x17\x17\x17"  # booster soft start
+    b"\x04\x80\xc8"  # power on and wait 200 ms
+    b"\x00\x01\x1f"  # panel setting: OTP LUT, black/white only
+    b"\x50\x01\x37"  # CDI setting
+    b"\x30\x01\x29"  # PLL set to 150 Hz
+    b"\x61\x03\x80\x01\x28"  # resolution 128x296
+    b"\x82\x81\x12\x32"  # VCM DC and delay 50ms
+)
+FAST_SECONDS_PER_FRAME = 5.0
+
+_fast_waveform = False
+
+
+def _use_fast_refresh(full):
+    """Whether this refresh may use the fast waveform (every FULL_REFRESH_EVERY-th is full)."""
+    if not FAST_REFRESH or not hasattr(board.DISPLAY, "update_refresh_mode"):
+        return False
+    count = sm_read_u32(SM_FAST_COUNT)
+    if full or count >= FULL_REFRESH_EVERY - 1:
+        sm_write_u32(SM_FAST_COUNT, 0)
+        return False
+    sm_write_u32(SM_FAST_COUNT, count + 1)
+    return True
+
+
+def wait_for_display():
+    """Light-sleep in short steps until the panel finishes refreshing."""
+    # A TimeAlarm paces the polls: board.DISPLAY owns EPD_BUSY, so it
+    # can't carry a PinAlarm
+    while board.DISPLAY.busy:
+        alarm.light_sleep_until_alarms(
+            alarm.time.TimeAlarm(monotonic_time=time.monotonic() + 0.05)
+        )
+
+
+def _refresh(full=False):
+    global _fast_waveform
     d = board.DISPLAY
+    # Once switched, the fast waveform stays until the next reset (which
+    # deep sleep provides), so only the first eligible refresh switches
+    if not _fast_waveform and _use_fast_refresh(full):
+        d.update_refresh_mode(FAST_START_SEQUENCE, FAST_SECONDS_PER_FRAME)
+        _fast_waveform = True
     r = d.time_to_refresh
     if r > 0:
         print(f"Waiting {r:.1f}s for display cooldown")
         time.sleep(r)
+    collect("build")  # drop the Group builder's temporaries before refreshing
     d.refresh()
-    while d.busy:
-        pass
+    wait_for_display()
 
 
 def render_loading(mac="", ip=""):
+    from adafruit_display_text.bitmap_label import Label
+    collect("render")
     d = board.DISPLAY
     g = displayio.Group()
     g.append(white_bg())
-    g.append(black_bar(WIDTH, HEADER_H))
-    g.append(Label(FONT, text="MEAL PLANNER", color=0xFFFFFF, x=8, y=HEADER_H // 2))
+    g.append(header_bar())
+    g.append(Label(FONT, text="MEAL PLANNER", color=0xFFFFFF, x=8, y=HEADER_Y))
     g.append(Label(FONT, text="Connecting...", color=0x000000, x=8, y=HEADER_H + 20))
     if mac:
         g.append(Label(FONT, text=f"MAC: {mac}", color=0x000000, x=8, y=HEADER_H + 36))
     if ip:
         g.append(Label(FONT, text=f"IP:  {ip}", color=0x000000, x=8, y=HEADER_H + 52))
+    sm_write_u32(SM_RENDER_KEY, 0)
     d.root_group = g
-    _refresh()
+    _refresh(full=True)
+
+
+def format_today(day, updated_at=""):
+    """Turn a fetched day into the strings render_today() draws (and the cache stores)."""
+    dinner = day["adult"]["dinner"] or "-"
+    if len(dinner) <= MAX_BIG:
+        dinner_lines = [dinner]
+    else:
+        line1, line2 = word_wrap(dinner, MAX_BIG)
+        dinner_lines = [line1, trunc(line2, MAX_BIG)]
+
+    bb = day["baby"]["breakfast"]
+    bl = day["baby"]["lunch"]
+    bd = day["baby"]["dinner"]
+    columns = [
+        [trunc(v, ITEM_CHARS) for v in [bb.get("cereal"), bb.get("yogurt"), bb.get("fruit")] if v],
+        [trunc(v, ITEM_CHARS) for v in [bl.get("meat"), bl.get("vegetable"), bl.get("fruit")] if v],
+        [trunc(v, ITEM_CHARS) for v in [bd.get("meat"), bd.get("vegetable"), bd.get("fruit")] if v],
+    ]
+    return {
+        "name": day["day"].upper(),
+        "date": day["date"],
+        "updated": updated_at,
+        "dinner": dinner_lines,
+        "columns": columns,
+    }
+
+
+def render_today(meals, batt, full=False, force=False):
+    """Render today's meal plan, skipping the refresh if unchanged unless force=True."""
+    dinner_lines = meals["dinner"]
+    columns = meals["columns"]
+
+    batt_s = format_batt(batt)
+    if batt < LOW_BATTERY_V:
+        batt_s = "!" + batt_s
 
+    # CRC of the packed content rather than hash() of a tuple: MicroPython
+    # sums item hashes for tuples, so moving an item between columns (or
+    # swapping two columns) would give the same key and skip the refresh.
+    # The update time is left out; it changes on every fetch.
+    stream = io.BytesIO()
+    msgpack.pack([meals["name"], meals["date"], dinner_lines, columns, batt_s], stream)
+    key = binascii.crc32(stream.getvalue())
+    if not force and key == sm_read_u32(SM_RENDER_KEY):
+        print(f"Unchanged: {meals['name']} {meals['date']}, skipping refresh")
+        return
 
-def render_today(day, batt, updated_at=""):
-    """Render today's meal plan with large text and clean layout."""
+    # bitmap_label draws each label into one bitmap; label.Label keeps a
+    # TileGrid per glyph, which costs far more objects per screen
+    from adafruit_display_text.bitmap_label import Label
+    collect("render")
     d = board.DISPLAY
     g = displayio.Group()
     g.append(white_bg())
 
     # ── Black header bar ──
-    g.append(black_bar(WIDTH, HEADER_H))
+    g.append(header_bar())
 
     # Day name at 2x scale (white on black)
-    day_name = day["day"].upper()
-    g.append(big_text(day_name, x=6, y=HEADER_H // 2, color=0xFFFFFF))
+    g.append(big_text(meals["name"], x=6, y=HEADER_Y, color=0xFFFFFF))
 
     # Date + update time + battery (small, white on black, right-aligned)
-    batt_s = f"{batt:.1f}v"
-    if batt < LOW_BATTERY_V:
-        batt_s = "!" + batt_s
-    time_part = f" {updated_at}" if updated_at else ""
-    info = f"{day['date']}{time_part}  {batt_s}"
+    time_part = f" {meals['updated']}" if meals["updated"] else ""
+    info = f"{meals['date']}{time_part}  {batt_s}"
     g.append(Label(FONT, text=info, color=0xFFFFFF,
-                   x=WIDTH - len(info) * CHAR_W - 6, y=HEADER_H // 2))
+                   x=WIDTH - len(info) * CHAR_W - 6, y=HEADER_Y))
 
-    y = HEADER_H + 12
+    y = DINNER_Y
 
     # ── Dinner (2x scale, wrap to 2 lines if needed) ──
-    dinner = day["adult"]["dinner"] or "-"
-    max_big = (WIDTH - 16) // (CHAR_W * 2)  # ~23 chars at 2x
-    if len(dinner) <= max_big:
-        g.append(big_text(dinner, x=6, y=y))
+    if len(dinner_lines) == 1:
+        g.append(big_text(dinner_lines[0], x=6, y=y))
         y += 20
     else:
-        line1, line2 = word_wrap(dinner, max_big)
-        g.append(big_text(line1, x=6, y=y))
+        g.append(big_text(dinner_lines[0], x=6, y=y))
         y += 22
-        g.append(big_text(trunc(line2, max_big) if len(line2) > max_big else line2, x=6, y=y))
+        g.append(big_text(dinner_lines[1], x=6, y=y))
         y += 16
 
     y += 2
@@ -210,79 +618,105 @@ def render_today(day, batt, updated_at=""):
     y += 8
 
     # ── Baby meals — three columns: breakfast, lunch, dinner ──
-    bb = day["baby"]["breakfast"]
-    bl = day["baby"]["lunch"]
-    bd = day["baby"]["dinner"]
-    c1 = 8
-    c2 = 104
-    c3 = 200
-
-    g.append(Label(FONT, text="BREAKFAST", color=0x000000, x=c1, y=y))
-    g.append(Label(FONT, text="LUNCH", color=0x000000, x=c2, y=y))
-    g.append(Label(FONT, text="DINNER", color=0x000000, x=c3, y=y))
-    y += 11
-
-    bfast_items = [v for v in [bb.get("cereal"), bb.get("yogurt"), bb.get("fruit")] if v]
-    lunch_items = [v for v in [bl.get("meat"), bl.get("vegetable"), bl.get("fruit")] if v]
-    dinner_items = [v for v in [bd.get("meat"), bd.get("vegetable"), bd.get("fruit")] if v]
-
-    max_rows = max(len(bfast_items), len(lunch_items), len(dinner_items))
-    for i in range(max_rows):
-        if i < len(bfast_items):
-            g.append(bullet(c1, y))
-            g.append(Label(FONT, text=trunc(bfast_items[i], 14), color=0x000000, x=c1 + 8, y=y))
-        if i < len(lunch_items):
-            g.append(bullet(c2, y))
-            g.append(Label(FONT, text=trunc(lunch_items[i], 14), color=0x000000, x=c2 + 8, y=y))
-        if i < len(dinner_items):
-            g.append(bullet(c3, y))
-            g.append(Label(FONT, text=trunc(dinner_items[i], 14), color=0x000000, x=c3 + 8, y=y))
-        y += 11
+    g.append(Label(FONT, text=COL_HEADINGS, color=0x000000, x=COL1_X, y=y))
+    y += ROW_H
+
+    g.append(bullets(columns, y))
+    # Straight pass per column — no per-row bounds checks
+    x = COL1_X + ITEM_X
+    for items in columns:
+        row_y = y
+        for text in items:
+            g.append(Label(FONT, text=text, color=0x000000, x=x, y=row_y))
+            row_y += ROW_H
+        x += COL_PITCH
 
     d.root_group = g
-    _refresh()
-    print(f"Rendered: {day['day']} {day['date']}")
+    _refresh(full=full)
+    sm_write_u32(SM_RENDER_KEY, key)
+    print(f"Rendered: {meals['name']} {meals['date']}")
 
 
 def render_error(msg, batt=None):
+    from adafruit_display_text.bitmap_label import Label
+    collect("render")
     d = board.DISPLAY
     g = displayio.Group()
     g.append(white_bg())
-    g.append(black_bar(WIDTH, HEADER_H))
-    g.append(Label(FONT, text="MEAL PLANNER", color=0xFFFFFF, x=8, y=HEADER_H // 2))
+    g.append(header_bar())
+    g.append(Label(FONT, text="MEAL PLANNER", color=0xFFFFFF, x=8, y=HEADER_Y))
     if batt is not None:
-        bs = f"{batt:.1f}v"
+        bs = format_batt(batt)
         g.append(Label(FONT, text=bs, color=0xFFFFFF,
-                       x=WIDTH - len(bs) * CHAR_W - 6, y=HEADER_H // 2))
+                       x=WIDTH - len(bs) * CHAR_W - 6, y=HEADER_Y))
     g.append(Label(FONT, text="Could not load meals:", color=0x000000, x=8, y=HEADER_H + 14))
-    g.append(Label(FONT, text=trunc(str(msg), (WIDTH - 16) // CHAR_W),
+    g.append(Label(FONT, text=trunc(str(msg), MAX_CHARS),
                    color=0x000000, x=8, y=HEADER_H + 30))
     g.append(Label(FONT, text=f"Retrying in {REFRESH_MINUTES}m",
                    color=0x000000, x=8, y=HEADER_H + 50))
+    sm_write_u32(SM_RENDER_KEY, 0)
     d.root_group = g
-    _refresh()
+    _refresh(full=True)
 
 
 # ── Deep sleep ──────────────────────────────────────────────
-def deep_sleep():
-    print(f"Deep sleeping for {REFRESH_MINUTES} minutes...")
+def sleep_seconds(updated_at=""):
+    """Seconds until the next timer wake: to WAKE_HOUR at night, else REFRESH_MINUTES."""
+    secs = REFRESH_MINUTES * 60
+    if SLEEP_HOUR == WAKE_HOUR:
+        return secs
+    try:
+        hh, mm = updated_at.split(":")
+        now = int(hh) % 24 * 60 + int(mm)
+    except ValueError:
+        return secs
+    start = SLEEP_HOUR * 60
+    end = WAKE_HOUR * 60
+    if start < end:
+        night = start <= now < end
+    else:  # window wraps midnight, e.g. 22 -> 6
+        night = now >= start or now < end
+    if not night:
+        return secs
+    return max(secs, (end - now) % 1440 * 60)
+
+
+def next_wake_at(seconds):
+    """RTC time of the next timer wake, on the schedule kept in SM_WAKE_AT."""
+    now = time.time()
+    due = sm_read_u32(SM_WAKE_AT)
+    if isinstance(alarm.wake_alarm, alarm.pin.PinAlarm) and due >= now + 60:
+        return due  # a button press leaves a pending wake (even night mode's) alone
+    if seconds != REFRESH_MINUTES * 60 or not due or due > now + seconds:
+        due = now + seconds  # night mode, or no usable slot: start from now
+    while due < now + 60:  # skip slots already passed or under a minute away
+        due += seconds
+    sm_write_u32(SM_WAKE_AT, due)
+    return due
+
+
+def deep_sleep(seconds=REFRESH_MINUTES * 60):
+    print(f"Deep sleeping for {seconds // 60} minutes...")
 
     # Wait for e-ink to finish — active refresh draws significant current
-    while board.DISPLAY.busy:
-        time.sleep(0.1)
+    wait_for_display()
 
     # Disable WiFi radio before sleeping
     wifi.radio.enabled = False
+    close_battery()
 
     # Timer wake: refresh on schedule
-    ta = alarm.time.TimeAlarm(
-        monotonic_time=time.monotonic() + REFRESH_MINUTES * 60
-    )
-    # Button wake: A (manual refresh) and C (manual refresh)
-    ba = alarm.pin.PinAlarm(pin=PIN_BTN_A, value=False, pull=True)
-    bc = alarm.pin.PinAlarm(pin=PIN_BTN_C, value=False, pull=True)
+    ta = alarm.time.TimeAlarm(epoch_time=next_wake_at(seconds))
+    # Button wake: any of the four buttons (RTC GPIO wake, no extra
+    # sleep current) — also the manual override during night mode
+    pin_alarms = [alarm.pin.PinAlarm(pin=p, value=False, pull=True) for p in BUTTON_PINS]
 
-    alarm.exit_and_deep_sleep_until_alarms(ta, ba, bc)
+    # Deep sleep resets pins, which would let the NeoPixel/sensor rail
+    # float back on for the whole sleep — hold it high (off) instead
+    try:
+        alarm.exit_and_deep_sleep_until_alarms(ta, *pin_alarms, preserve_dios=(_neopixel_power,))
+    except TypeError:  # CircuitPython < 9 has no preserve_dios
+        alarm.exit_and_deep_sleep_until_alarms(ta, *pin_alarms)
 
 
 # ── Main ────────────────────────────────────────────────────
@@ -296,35 +730,70 @@ elif isinstance(wake, alarm.time.TimeAlarm):
 else:
     print("Fresh boot (power-on/reset)")
 
-# Only show loading screen on fresh boot (not timer/button wake)
-mac = get_mac()
-print(f"MAC: {mac}")
+# Button wake: redraw the last fetch from sleep memory if it's still
+# fresh — no WiFi, no HTTP. Falls through to a normal fetch otherwise.
+# Button A always refetches, for when the plan was just edited.
+if isinstance(wake, alarm.pin.PinAlarm) and wake.pin != PIN_BTN_A:
+    cached = load_today()
+    if cached:
+        print("Rendering cached meals")
+        render_today(cached, read_battery(), force=True)
+        deep_sleep()
+    print("No fresh meal cache, fetching")
+
+# After power-on sleep memory may hold garbage — never trust a saved AP,
+# lease, wake schedule or meal cache (the RTC restarted too)
 if wake is None:
-    render_loading(mac=mac)
+    save_ap(0, b"\x00" * 6)
+    forget_net()
+    sm_write_u32(SM_WAKE_AT, 0)
+    sm_write_u32(SM_CACHE, 0)
 
-connect()
-ip = str(wifi.radio.ipv4_address)
-print(f"IP:  {ip}")
-
-# Show loading with IP only on fresh boot
-if wake is None:
-    render_loading(mac=mac, ip=ip)
-
-pool = socketpool.SocketPool(wifi.radio)
-session = adafruit_requests.Session(pool)
+mac = get_mac()
+print(f"MAC: {mac}")
 
 batt = read_battery()
 print(f"Battery: {batt:.2f}V")
 
+# Everything from the WiFi join on is guarded: any failure shows the
+# error screen and deep sleeps until the next retry, rather than leaving
+# code.py stopped on a traceback with the board awake
 try:
-    today, updated_at = fetch_today(session)
+    # Fresh boot: the red LED shows we're joining WiFi. The loading screen
+    # waits for the IP so power-on costs one full e-ink refresh, not two.
+    if wake is None:
+        led = digitalio.DigitalInOut(board.LED)
+        led.switch_to_output(value=True)
+        try:
+            connect()
+        finally:
+            led.deinit()
+    else:
+        connect()
+    ip = str(wifi.radio.ipv4_address)
+    print(f"IP:  {ip}")
+    if wake is None:
+        render_loading(mac=mac, ip=ip)
+
+    import adafruit_requests  # only wakes that fetch get this far
+
+    pool = socketpool.SocketPool(wifi.radio)
+    session = adafruit_requests.Session(pool)
+    base, host, server_ip = api_target(pool)
+    # Saved before the fetch, which turns the radio (and its lease) off;
+    # a failure below forgets it again
+    save_net(server_ip)
+    meals = format_today(*fetch_today(session, base, host))
+    save_today(meals)
 except Exception as e:
     print(f"Error: {e}")
+    forget_net()  # stale lease or server address — redo DHCP/DNS next wake
+    wifi.radio.enabled = False  # still on if the join or request failed
     render_error(e, batt)
     deep_sleep()
 
-# Render meals, disable WiFi, deep sleep immediately
-render_today(today, batt, updated_at)
-wifi.radio.enabled = False
-print("WiFi disabled")
-deep_sleep()
+# Timer/button wakes may use the fast waveform; a fresh boot always gets
+# a full refresh so whatever was on the panel before is cleared
+render_today(meals, batt, full=wake is None,
+             force=isinstance(wake, alarm.pin.PinAlarm))
+deep_sleep(sleep_seconds(meals["updated"]))
@@ -0,0 +1,91 @@
+/**
+ * @fileoverview Minimal MessagePack encoder for the MagTag endpoint.
+ * CircuitPython ships a native msgpack module, so the device can decode
+ * this in C instead of scanning JSON character by character.
+ * Covers the JSON-compatible subset: null, booleans, numbers, strings,
+ * arrays and plain objects.
+ * @module msgpack
+ */
+
+/** Content type served when a client sends `Accept: application/msgpack` */
+export const MSGPACK_CONTENT_TYPE = 'application/msgpack';
+
+/** Appends a type byte followed by a big-endian unsigned length/value */
+function pushUint(out: number[], type: number, value: number, bytes: 1 | 2 | 4): void {
+  out.push(type);
+  for (let shift = (bytes - 1) * 8; shift >= 0; shift -= 8) {
+    out.push((value >>> shift) & 0xff);
+  }
+}
+
+/** Appends a header whose size class depends on the length (str/array/map) */
+function pushLength(out: number[], len: number, fix: number, fixMax: number, codes: [number | null, number, number]): void {
+  if (len <= fixMax) {
+    out.push(fix | len);
+  } else if (codes[0] !== null && len <= 0xff) {
+    pushUint(out, codes[0], len, 1);
+  } else if (len <= 0xffff) {
+    pushUint(out, codes[1], len, 2);
+  } else {
+    pushUint(out, codes[2], len, 4);
+  }
+}
+
+function encodeNumber(out: number[], n: number): void {
+  if (Number.isInteger(n) && n >= -0x80000000 && n <= 0xffffffff) {
+    if (n >= 0) {
+      if (n < 0x80) out.push(n);
+      else if (n <= 0xff) pushUint(out, 0xcc, n, 1);
+      else if (n <= 0xffff) pushUint(out, 0xcd, n, 2);
+      else pushUint(out, 0xce, n, 4);
+    } else {
+      if (n >= -32) out.push(n & 0xff);
+      else if (n >= -0x80) pushUint(out, 0xd0, n & 0xff, 1);
+      else if (n >= -0x8000) pushUint(out, 0xd1, n & 0xffff, 2);
+      else pushUint(out, 0xd2, n >>> 0, 4);
+    }
+    return;
+  }
+  // Fractions and integers beyond 32 bits go out as float64
+  const buf = Buffer.alloc(8);
+  buf.writeDoubleBE(n);
+  out.push(0xcb);
+  for (const b of buf) out.push(b);
+}
+
+function encodeValue(out: number[], value: unknown): void {
+  if (value === null || value === undefined) {
+    out.push(0xc0);
+  } else if (typeof value === 'boolean') {
+    out.push(value ? 0xc3 : 0xc2);
+  } else if (typeof value === 'number') {
+    encodeNumber(out, value);
+  } else if (typeof value === 'string') {
+    const bytes = Buffer.from(value, 'utf8');
+    pushLength(out, bytes.length, 0xa0, 31, [0xd9, 0xda, 0xdb]);
+    for (const b of bytes) out.push(b);
+  } else if (Array.isArray(value)) {
+    pushLength(out, value.length, 0x90, 15, [null, 0xdc, 0xdd]);
+    for (const item of value) encodeValue(out, item);
+  } else if (typeof value === 'object') {
+    // Like JSON.stringify, drop keys whose value is undefined
+    const entries = Object.entries(value).filter(([, v]) => v !== undefined);
+    pushLength(out, entries.length, 0x80, 15, [null, 0xde, 0xdf]);
+    for (const [k, v] of entries) {
+      encodeValue(out, k);
+      encodeValue(out, v);
+    }
+  } else {
+    throw new TypeError(`Cannot encode ${typeof value} as MessagePack`);
+  }
+}
+
+/**
+ * Encodes a JSON-compatible value as MessagePack.
+ * @throws {TypeError} For functions, symbols and bigints
+ */
+export function encode(value: unknown): Buffer {
+  const out: number[] = [];
+  encodeValue(out, value);
+  return Buffer.from(out);
+}
@@ -13,8 +13,10 @@ import rateLimit from 'express-rate-limit';
 import config from './config.js';
 import * as db from './db.js';
 import * as backup from './backup.js';
+import * as msgpack from './msgpack.js';
 import logger from './logger.js';
 import './types/index.js'; // Import for Express Request extension
+import type { UpcomingScheduleResponse } from './types/index.js';
 
 // Read version from package.json at startup
 const packageJson = JSON.parse(readFileSync(join(import.meta.dirname, '..', 'package.json'), 'utf-8'));
@@ -127,6 +129,7 @@ app.get('/api/suggestions', (_req: Request, res: Response) => {
 // --- Constants used by route handlers ---
 
 const VALID_LOOKAHEADS = [3, 5, 7];
+const MAX_UPCOMING_DAYS = 7;
 const VALID_MEAL_TYPES = ['baby_breakfast', 'baby_lunch', 'baby_dinner'];
 
 // --- Look-ahead endpoint ---
@@ -580,14 +583,26 @@ app.get('/api/schedule/current', (_req: Request, res: Response) => {
 });
 
 /**
- * GET /api/schedule/upcoming
- * Returns today plus the next 2 days' meals.
- * Optimized endpoint for MagTag e-ink display.
+ * GET /api/schedule/upcoming?days=N
+ * Returns today plus the following days' meals (N: 1-7, default 3).
+ * Optimized endpoint for MagTag e-ink display. Sends MessagePack instead
+ * of JSON when the client asks for it with `Accept: application/msgpack`.
  */
-app.get('/api/schedule/upcoming', (_req: Request, res: Response) => {
+app.get('/api/schedule/upcoming', (req: Request, res: Response) => {
   try {
-    const days = db.getUpcomingDays(3);
-    res.json({ days, updated_at: db.getEasternTimeString() });
+    const daysParam = req.query.days === undefined ? 3 : parseInt(req.query.days as string, 10);
+    if (!Number.isInteger(daysParam) || daysParam < 1 || daysParam > MAX_UPCOMING_DAYS) {
+      res.status(400).json({ error: `Invalid days. Must be 1-${MAX_UPCOMING_DAYS}.` });
+      return;
+    }
+    const days = db.getUpcomingDays(daysParam);
+    const body: UpcomingScheduleResponse = { days, updated_at: db.getEasternTimeString() };
+    res.vary('Accept');
+    if (req.accepts(['application/json', msgpack.MSGPACK_CONTENT_TYPE]) === msgpack.MSGPACK_CONTENT_TYPE) {
+      res.type(msgpack.MSGPACK_CONTENT_TYPE).send(msgpack.encode(body));
+      return;
+    }
+    res.json(body);
   } catch (err) {
     logger.error({ err }, 'Error fetching upcoming schedule');
     res.status(500).json({ error: 'Internal server error' });
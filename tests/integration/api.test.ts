@@ -298,6 +298,46 @@ describe('API Endpoints', () => {
         expect(day.date).toMatch(/^\d{4}-\d{2}-\d{2}$/);
       }
     });
+
+    it('limits results with ?days=N', async () => {
+      const res = await client.get('/api/schedule/upcoming?days=1');
+
+      expect(res.status).toBe(200);
+      expect(res.body.days).toHaveLength(1);
+    });
+
+    it('returns MessagePack when requested via Accept', async () => {
+      const res = await client.get('/api/schedule/upcoming?days=1')
+        .set('Accept', 'application/msgpack')
+        .buffer(true)
+        .parse((r, cb) => {
+          const chunks: Buffer[] = [];
+          r.on('data', (c: Buffer) => chunks.push(c));
+          r.on('end', () => cb(null, Buffer.concat(chunks)));
+        });
+
+      expect(res.status).toBe(200);
+      expect(res.headers['content-type']).toContain('application/msgpack');
+      expect(res.headers['vary']).toContain('Accept');
+      const body = res.body as Buffer;
+      expect(body[0]).toBe(0x82); // map with 2 keys: days, updated_at
+      expect(body.subarray(1, 6).toString('latin1')).toBe('\xa4days');
+    });
+
+    it('returns JSON for a generic Accept header', async () => {
+      const res = await client.get('/api/schedule/upcoming').set('Accept', '*/*');
+
+      expect(res.status).toBe(200);
+      expect(res.headers['content-type']).toContain('application/json');
+    });
+
+    it('returns 400 for out-of-range days', async () => {
+      for (const days of ['0', '8', 'abc']) {
+        const res = await client.get(`/api/schedule/upcoming?days=${days}`);
+        expect(res.status).toBe(400);
+        expect(res.body.error).toContain('Invalid days');
+      }
+    });
   });
 
   describe('GET /api/schedule/:weekOf', () => {
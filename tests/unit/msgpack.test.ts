@@ -0,0 +1,63 @@
+/**
+ * @fileoverview Unit tests for the minimal MessagePack encoder.
+ * Expected bytes follow the MessagePack spec's smallest-form encodings.
+ */
+
+import { describe, it, expect } from 'vitest';
+import { encode } from '../../src/msgpack.js';
+
+/** Hex string of the encoded value, for compact expectations */
+function hex(value: unknown): string {
+  return encode(value).toString('hex');
+}
+
+describe('encode', () => {
+  it('encodes nil and booleans', () => {
+    expect(hex(null)).toBe('c0');
+    expect(hex(undefined)).toBe('c0');
+    expect(hex(true)).toBe('c3');
+    expect(hex(false)).toBe('c2');
+  });
+
+  it('uses the smallest integer form', () => {
+    expect(hex(0)).toBe('00');
+    expect(hex(127)).toBe('7f');
+    expect(hex(128)).toBe('cc80');
+    expect(hex(256)).toBe('cd0100');
+    expect(hex(65536)).toBe('ce00010000');
+    expect(hex(-1)).toBe('ff');
+    expect(hex(-32)).toBe('e0');
+    expect(hex(-33)).toBe('d0df');
+    expect(hex(-129)).toBe('d1ff7f');
+    expect(hex(-32769)).toBe('d2ffff7fff');
+  });
+
+  it('encodes fractions as float64', () => {
+    expect(hex(1.5)).toBe('cb3ff8000000000000');
+  });
+
+  it('encodes strings by UTF-8 byte length', () => {
+    expect(hex('')).toBe('a0');
+    expect(hex('abc')).toBe('a3616263');
+    expect(hex('é')).toBe('a2c3a9');
+    expect(hex('x'.repeat(32)).slice(0, 4)).toBe('d920');
+    expect(hex('x'.repeat(256)).slice(0, 6)).toBe('da0100');
+  });
+
+  it('encodes arrays and maps', () => {
+    expect(hex([])).toBe('90');
+    expect(hex([1, 2, 3])).toBe('93010203');
+    expect(hex(new Array(16).fill(0)).slice(0, 6)).toBe('dc0010');
+    expect(hex({})).toBe('80');
+    expect(hex({ a: 1 })).toBe('81a16101');
+  });
+
+  it('drops undefined object values like JSON.stringify', () => {
+    expect(hex({ a: 1, b: undefined })).toBe(hex({ a: 1 }));
+  });
+
+  it('throws for values with no JSON equivalent', () => {
+    expect(() => encode(() => 1)).toThrow(TypeError);
+    expect(() => encode(10n)).toThrow(TypeError);
+  });
+});